@@ -0,0 +1,75 @@
+import pytest
+import numpy as np
+
+import xzar
+from xzar.exceptions import ArgumentValidationError, ResolvingError
+
+
+class TestApi:
+    def test_ner(self):
+        entities = xzar.ner(["Barack Obama went to Austria.", "Nothing here."])
+
+        assert list(entities) == [
+            [("Barack Obama", "PERSON"), ("Austria", "GPE")],
+            [],
+        ]
+
+        with pytest.raises(ArgumentValidationError):
+            xzar.ner([], processes=0)
+
+    def test_validation(self):
+        with pytest.raises(ArgumentValidationError):
+            xzar.ner([], lang="xx")
+
+        with pytest.raises(ArgumentValidationError):
+            xzar.ner([], model_size="xl")
+
+        with pytest.raises(ArgumentValidationError):
+            xzar.ner([], batch_size="12")
+
+        with pytest.raises(ArgumentValidationError):
+            xzar.cluster(np.empty((0, 2)), clusters=2.5)
+
+        # NOTE: CLI-only options are rejected rather than ignored
+        with pytest.raises(TypeError):
+            xzar.ner([], lang_column="lang")
+
+        with pytest.raises(TypeError):
+            xzar.embed([], output="out.csv")
+
+        with pytest.raises(TypeError):
+            xzar.cluster(np.empty((0, 2)), clusters=2, progress="none")
+
+    def test_embed(self):
+        embeddings = xzar.embed(["Barack Obama went to Austria.", "Nothing here."])
+
+        assert embeddings.shape == (2, 384)
+
+    def test_cluster(self):
+        embeddings = np.array(
+            [[1.0, 0.0], [0.0, 1.0], [0.99, 0.01], [0.02, 0.98]], dtype=np.float32
+        )
+
+        assert xzar.cluster(embeddings, clusters=2).tolist() in (
+            [0, 1, 0, 1],
+            [1, 0, 1, 0],
+        )
+        assert xzar.cluster(embeddings, threshold=0.95).tolist() == [0, 1, 0, 1]
+
+        with pytest.raises(ResolvingError):
+            xzar.cluster(embeddings)
+
+        with pytest.raises(TypeError):
+            xzar.cluster(embeddings, clusters=2, unknown=True)
+
+        with pytest.raises(ValueError):
+            xzar.cluster(embeddings, clusters=5)
+
+        with pytest.raises(ValueError):
+            xzar.cluster(embeddings[0], clusters=2)
+
+        with pytest.raises(ArgumentValidationError):
+            xzar.cluster(embeddings, clusters=2, batch_size=0)
+
+        with pytest.raises(ArgumentValidationError):
+            xzar.cluster(embeddings, threshold=0.95, max_leaders=0)
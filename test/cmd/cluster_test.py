@@ -0,0 +1,48 @@
+from ..utils import xzar
+
+DATA = [
+    ["text", "dim_0", "dim_1", "dim_2"],
+    ["a", "1.0", "0.0", "0.0"],
+    ["b", "0.0", "1.0", "0.0"],
+    ["c", "0.99", "0.01", "0.0"],
+    ["d", "0.0", "0.0", "1.0"],
+    ["e", "0.01", "0.98", "0.0"],
+    ["f", "0.0", "0.02", "0.99"],
+]
+
+EXPECTED_GROUPS = [{0, 2}, {1, 4}, {3, 5}]
+
+
+def groups(output):
+    assert output[0] == ["cluster"]
+
+    clusters = {}
+
+    for i, (label,) in enumerate(output[1:]):
+        clusters.setdefault(label, set()).add(i)
+
+    return sorted(clusters.values(), key=min)
+
+
+class TestClusterCommand:
+    def test_kmeans(self):
+        assert groups(xzar(["cluster", "-k", "3"], DATA)) == EXPECTED_GROUPS
+
+    def test_threshold(self):
+        output = xzar(["cluster", "-t", "0.95", "-B", "2"], DATA)
+
+        assert output == [["cluster"], ["0"], ["1"], ["0"], ["2"], ["1"], ["2"]]
+
+        output = xzar(["cluster", "-t", "0.95", "--max-leaders", "1", "-B", "2"], DATA)
+
+        assert output == [["cluster"], ["0"], ["1"], ["2"], ["3"], ["4"], ["3"]]
+
+    def test_empty(self):
+        assert xzar(["cluster", "-k", "3"], []) == [["cluster"]]
+        assert xzar(["cluster", "-t", "0.95"], []) == [["cluster"]]
+        assert xzar(["cluster", "-k", "3"], DATA[:1]) == [["cluster"]]
+
+    def test_output(self, tmp_path):
+        output = xzar(["cluster", "-k", "3", "-o", str(tmp_path / "out.csv")], DATA)
+
+        assert groups(output) == EXPECTED_GROUPS
@@ -1,3 +1,12 @@
+import csv
+from io import StringIO
+
+import numpy as np
+import pytest
+
+from xzar.cmd.embed import format_embedding_rows, validate_float_format
+from xzar.exceptions import ArgumentValidationError
+
 from ..utils import xzar
 
 DEFAULT_EMBEDDING_SIZE = 384
@@ -13,3 +22,32 @@ class TestEmbedCommand:
         assert headers == expected_headers
         assert len(row[1:]) == DEFAULT_EMBEDDING_SIZE
         assert all(float(x) for x in row[1:])
+
+    def test_format_embedding_rows(self):
+        embeddings = np.array(
+            [[0.5, -1.25], [3.0, 1e-7], [0.0, 2.0], [1.0, 1.0], [2.0, 2.0]],
+            dtype=np.float32,
+        )
+        rows = [["hello, world", "a"], ['say "hi"\n'], [""], ["hello\nworld"], ["a\rb"]]
+
+        output = format_embedding_rows(rows, embeddings, "%.3g")
+
+        assert output == (
+            '"hello, world",a,0.5,-1.25\r\n"say ""hi""\n",3,1e-07\r\n,0,2\r\n'
+            '"hello\nworld",1,1\r\n"a\rb",2,2\r\n'
+        )
+        assert list(csv.reader(StringIO(output, newline=""))) == [
+            ["hello, world", "a", "0.5", "-1.25"],
+            ['say "hi"\n', "3", "1e-07"],
+            ["", "0", "2"],
+            ["hello\nworld", "1", "1"],
+            ["a\rb", "2", "2"],
+        ]
+
+    def test_validate_float_format(self):
+        validate_float_format("%.6g")
+        validate_float_format("%.3e")
+
+        for float_format in ["%.6g\n", "%.3g,", '"%g"', "%g%g", "x%g", "%", "%s %s"]:
+            with pytest.raises(ArgumentValidationError):
+                validate_float_format(float_format)
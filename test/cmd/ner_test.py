@@ -8,3 +8,35 @@ class TestNerCommand:
             ["Barack Obama", "PERSON"],
             ["Austria", "GPE"],
         ]
+
+    def test_processes(self):
+        data = [["text"]] + [["Barack Obama went to Austria."], ["Nothing here."]] * 5
+
+        assert (
+            xzar(["ner", "text", "-p", "2", "-B", "3"], data)
+            == [["entity", "entity_type"]]
+            + [["Barack Obama", "PERSON"], ["Austria", "GPE"]] * 5
+        )
+
+    def test_lang_column(self):
+        data = [
+            ["text", "lang"],
+            ["Barack Obama went to Austria.", "en"],
+            ["Emmanuel Macron est allé à Berlin.", "fr-FR"],
+            ["Angela Merkel reiste nach Paris.", "de"],
+            ["Joe Biden went to Spain.", "unknown"],
+        ]
+
+        output = xzar(["ner", "text", "--lang-column", "lang", "-B", "2"], data)
+
+        assert output[0] == ["lang", "entity", "entity_type"]
+        assert [row[:2] for row in output[1:]] == [
+            ["en", "Barack Obama"],
+            ["en", "Austria"],
+            ["fr-FR", "Emmanuel Macron"],
+            ["fr-FR", "Berlin"],
+            ["de", "Angela Merkel"],
+            ["de", "Paris"],
+            ["unknown", "Joe Biden"],
+            ["unknown", "Spain"],
+        ]
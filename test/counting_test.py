@@ -0,0 +1,41 @@
+import os
+
+import xzar.counting
+from xzar.counting import (
+    count_csv_records,
+    cached_count_csv_records,
+    get_count_cache_path,
+)
+
+
+class TestCounting:
+    def test_count_csv_records(self, tmp_path, monkeypatch):
+        path = tmp_path / "data.csv"
+
+        path.write_text("")
+        assert count_csv_records(str(path)) == 0
+
+        path.write_text("name,text\n")
+        assert count_csv_records(str(path)) == 0
+
+        path.write_text("name,text\njohn,hello\nmary,world")
+        assert count_csv_records(str(path)) == 2
+
+        path.write_text(
+            'name,text\njohn,"hello\nworld"\nmary,"a ""quoted\n"" text"\r\npaul,\n'
+        )
+        assert count_csv_records(str(path)) == 3
+
+        # Quoted newlines spanning over several chunks
+        monkeypatch.setattr(xzar.counting, "CHUNK_SIZE", 4)
+        assert count_csv_records(str(path)) == 3
+
+    def test_cached_count_csv_records(self, tmp_path):
+        path = tmp_path / "data.csv"
+        path.write_text("name\njohn\nmary\n")
+
+        assert cached_count_csv_records(str(path)) == 2
+        assert os.path.isfile(get_count_cache_path(str(path)))
+
+        path.write_text("name\njohn\nmary\npaul\n")
+        assert cached_count_csv_records(str(path)) == 3
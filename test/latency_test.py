@@ -0,0 +1,32 @@
+import pytest
+from time import sleep
+
+from xzar.utils import as_latency_bounded_chunks
+
+
+def stream():
+    yield 1
+    yield 2
+    sleep(0.3)
+    yield 3
+
+
+def broken_stream():
+    yield 1
+    raise RuntimeError
+
+
+class TestLatency:
+    def test_as_latency_bounded_chunks(self):
+        assert list(as_latency_bounded_chunks(10, stream())) == [[1, 2, 3]]
+        assert list(as_latency_bounded_chunks(2, stream())) == [[1, 2], [3]]
+        assert list(as_latency_bounded_chunks(10, stream(), 0.1)) == [[1, 2], [3]]
+        assert list(as_latency_bounded_chunks(10, range(5), 0.1)) == [[0, 1, 2, 3, 4]]
+        assert list(as_latency_bounded_chunks(2, range(5), 0.1)) == [
+            [0, 1],
+            [2, 3],
+            [4],
+        ]
+
+        with pytest.raises(RuntimeError):
+            list(as_latency_bounded_chunks(10, broken_stream(), 0.1))
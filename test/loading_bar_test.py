@@ -0,0 +1,40 @@
+import os
+import json
+
+from xzar.counting import get_count_cache_path
+from xzar.loading_bar import LoadingBar, set_progress_mode
+
+
+class TestLoadingBar:
+    def test_json_progress(self, capsys):
+        set_progress_mode("json")
+
+        try:
+            with LoadingBar("Testing", total=10) as loading_bar:
+                loading_bar.advance(4)
+                loading_bar.advance()
+        finally:
+            set_progress_mode("auto")
+
+        lines = capsys.readouterr().err.splitlines()
+        report = json.loads(lines[-1])
+
+        assert report["task"] == "Testing"
+        assert report["rows"] == 5
+        assert report["total"] == 10
+        assert report["done"]
+
+    def test_no_count_without_progress(self, tmp_path):
+        path = tmp_path / "input.csv"
+        path.write_text("text\na\nb\n")
+
+        set_progress_mode("none")
+
+        try:
+            with open(path) as f, LoadingBar("Testing") as loading_bar:
+                loading_bar.count_in_background(f)
+        finally:
+            set_progress_mode("auto")
+
+        assert loading_bar.total is None
+        assert not os.path.exists(get_count_cache_path(str(path)))
@@ -0,0 +1,56 @@
+import xzar.ner_pool
+from xzar.ner_pool import NerPool, MAX_HELD_BATCHES
+
+
+class Entity:
+    def __init__(self, text: str, label: str):
+        self.text = text
+        self.label_ = label
+
+
+class Doc:
+    def __init__(self, text: str, label: str):
+        self.ents = [Entity(text, label)]
+
+
+class StubPipeline:
+    def __init__(self, lang: str):
+        self.lang = lang
+
+    def pipe(self, tuples, as_tuples=False, batch_size=None):
+        for text, context in tuples:
+            yield Doc(text, self.lang), context
+
+
+class TestNerPool:
+    def test_skewed_routing(self, monkeypatch):
+        monkeypatch.setattr(
+            xzar.ner_pool,
+            "acquire_model",
+            lambda lang, *args, **kwargs: StubPipeline(lang),
+        )
+
+        n = 1000
+        batch_size = 10
+        read = 0
+
+        def items():
+            nonlocal read
+
+            for i in range(n):
+                read += 1
+                yield str(i), "fr" if i == 0 else "en", i
+
+        emitted = []
+
+        with NerPool("en", "sm", batch_size=batch_size) as pool:
+            for batch in pool.imap_routed_batches(items()):
+                for entities, i in batch:
+                    assert read - i <= batch_size * (MAX_HELD_BATCHES + 1)
+                    emitted.append((entities, i))
+
+        # NOTE: the rare lang row at the head of the input must not hold every
+        # following row until the end of the input
+        assert [i for _, i in emitted] == list(range(n))
+        assert emitted[0][0] == [("0", "fr")]
+        assert emitted[1][0] == [("1", "en")]
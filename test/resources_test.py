@@ -0,0 +1,87 @@
+import os
+import json
+
+import xzar.resources
+from xzar.loading_bar import set_progress_mode
+from xzar.resources import (
+    THREAD_ENV_VARIABLES,
+    ResourcePlan,
+    read_cgroup_cpu_quota,
+    plan_resources,
+    apply_resource_plan,
+    log_resource_plan,
+)
+
+
+class TestResources:
+    def test_read_cgroup_cpu_quota(self, tmp_path):
+        assert read_cgroup_cpu_quota(str(tmp_path)) is None
+
+        (tmp_path / "cpu.max").write_text("max 100000\n")
+        assert read_cgroup_cpu_quota(str(tmp_path)) is None
+
+        (tmp_path / "cpu.max").write_text("250000 100000\n")
+        assert read_cgroup_cpu_quota(str(tmp_path)) == 2.5
+
+        (tmp_path / "cpu.max").unlink()
+        (tmp_path / "cpu").mkdir()
+        (tmp_path / "cpu" / "cpu.cfs_quota_us").write_text("-1\n")
+        (tmp_path / "cpu" / "cpu.cfs_period_us").write_text("100000\n")
+        assert read_cgroup_cpu_quota(str(tmp_path)) is None
+
+        (tmp_path / "cpu" / "cpu.cfs_quota_us").write_text("50000\n")
+        assert read_cgroup_cpu_quota(str(tmp_path)) == 0.5
+
+    def test_plan_resources(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(xzar.resources, "count_affinity_cpus", lambda: 8)
+
+        plan = plan_resources(-1, root=str(tmp_path))
+        assert (plan.cpus, plan.processes, plan.threads) == (8, 8, 1)
+        assert plan.constraint == "affinity mask"
+
+        plan = plan_resources(2, root=str(tmp_path))
+        assert (plan.cpus, plan.processes, plan.threads) == (8, 2, 4)
+
+        (tmp_path / "cpu.max").write_text("250000 100000\n")
+
+        plan = plan_resources(-1, root=str(tmp_path))
+        assert (plan.cpus, plan.processes, plan.threads) == (3, 3, 1)
+        assert plan.constraint == "cgroup quota"
+
+        plan = plan_resources(1, root=str(tmp_path))
+        assert (plan.cpus, plan.processes, plan.threads) == (3, 1, 3)
+
+    def test_apply_resource_plan(self, monkeypatch):
+        monkeypatch.setattr(
+            xzar.resources, "USER_THREAD_ENV_VARIABLES", {"OMP_NUM_THREADS"}
+        )
+
+        for name in THREAD_ENV_VARIABLES:
+            monkeypatch.setenv(name, "1")
+
+        apply_resource_plan(ResourcePlan(8, 1, 8, "affinity mask"))
+        apply_resource_plan(ResourcePlan(8, 4, 2, "affinity mask"))
+
+        assert os.environ["OMP_NUM_THREADS"] == "1"
+        assert os.environ["MKL_NUM_THREADS"] == "2"
+
+    def test_log_resource_plan_json(self, capsys):
+        set_progress_mode("json")
+
+        try:
+            log_resource_plan(ResourcePlan(4, 2, 2, "affinity mask"))
+        finally:
+            set_progress_mode("auto")
+
+        lines = capsys.readouterr().err.splitlines()
+
+        assert [json.loads(line) for line in lines] == [
+            {
+                "resources": {
+                    "cpus": 4,
+                    "processes": 2,
+                    "threads": 2,
+                    "constraint": "affinity mask",
+                }
+            }
+        ]
@@ -1,7 +1,9 @@
-from subprocess import Popen, PIPE
 import csv
 import sys
 from io import StringIO
+from contextlib import redirect_stdout, redirect_stderr
+
+from xzar.__main__ import main
 
 CsvData = list[list[str]]
 
@@ -13,21 +15,29 @@ def xzar(args: list[str], data: CsvData) -> CsvData:
     for row in data:
         writer.writerow(row)
 
-    process = Popen(
-        [sys.executable, "-m", "xzar"] + args,
-        stdin=PIPE,
-        stdout=PIPE,
-        stderr=PIPE,
-        text=True,
-    )
-
-    stdout, stderr = process.communicate(input_data.getvalue())
-
-    if process.returncode != 0:
-        raise AssertionError(stderr)
+    input_data.seek(0)
 
     output_data = StringIO()
-    output_data.write(stdout)
+    error_data = StringIO()
+
+    stdin = sys.stdin
+    sys.stdin = input_data
+
+    try:
+        with redirect_stdout(output_data), redirect_stderr(error_data):
+            main(args)
+    except SystemExit as e:
+        if e.code:
+            raise AssertionError(error_data.getvalue())
+    finally:
+        sys.stdin = stdin
+
+    # NOTE: reading the output file right after the command returned checks
+    # that it was properly closed
+    if "-o" in args:
+        with open(args[args.index("-o") + 1], "r", encoding="utf-8", newline="") as f:
+            return list(csv.reader(f))
+
     output_data.seek(0)
 
     return list(csv.reader(output_data))
@@ -0,0 +1,3 @@
+from .api import ner, embed, cluster
+
+__all__ = ["ner", "embed", "cluster"]
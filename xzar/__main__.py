@@ -8,7 +8,7 @@ import casanova
 
 from .cmd import SUBCOMMANDS
 from .console import console
-from .argparse import create_parser, bind_namespace_to_args, resolve
+from .argparse import create_parser, bind_namespace_to_args, resolve, release
 from .exceptions import ArgumentValidationError, ResolvingError
 
 # ~3mb
@@ -53,10 +53,10 @@ def with_cli_exceptions(fn):
 
 
 @with_cli_exceptions
-def main() -> None:
+def main(argv: list[str] | None = None) -> None:
     global_setup()
     parser = create_parser("xzar", SUBCOMMANDS)
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
 
     if not hasattr(args, "__args"):
         parser.print_help()
@@ -68,12 +68,15 @@ def main() -> None:
             sys.exit(1)
 
         try:
-            resolve(bound_args)
-        except ResolvingError as e:
-            console.print("[red]" + str(e))
-            sys.exit(1)
-
-        args.__fn(bound_args)
+            try:
+                resolve(bound_args)
+            except ResolvingError as e:
+                console.print("[red]" + str(e))
+                sys.exit(1)
+
+            args.__fn(bound_args)
+        finally:
+            release(bound_args)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,204 @@
+from typing import Iterable, Iterator, TYPE_CHECKING
+
+import atexit
+
+from .argparse import bind_kwargs_to_args
+from .cmd.cluster import ClusterArgs
+from .cmd.embed import EmbedArgs
+from .cmd.ner import NerArgs
+from .ner_pool import Entities, NerPool
+from .resources import plan_resources, apply_resource_plan
+from .utils import as_latency_bounded_chunks
+
+if TYPE_CHECKING:
+    import numpy as np
+
+# In-process library API:
+#   - functions take the same arguments as their CLI counterparts, minus the
+#     ones only relevant to CSV files, with the same defaults and validation,
+#     since they are bound and checked against the same typed arguments
+#     classes. They also share their processing code with the commands.
+#   - they work on python iterables and numpy arrays instead of CSV files.
+#   - models are cached, so that subsequent calls don't need to reload them.
+#     This is also true when using multiple processes, since the last NER
+#     pool is kept alive, along with the models loaded by its workers, until
+#     a call needs a differently configured one and no iterator uses it.
+
+# NOTE: options only making sense for CSV files, like --lang-column, are not
+# accepted as kwargs, instead of being silently ignored
+NER_API_ARGS = ["lang", "model_size", "processes", "batch_size", "max_latency"]
+EMBED_API_ARGS = ["model", "batch_size", "max_latency"]
+CLUSTER_API_ARGS = [
+    "clusters",
+    "threshold",
+    "batch_size",
+    "epochs",
+    "normalize",
+    "max_leaders",
+    "seed",
+]
+
+# NOTE: (pool configuration, pool)
+CACHED_NER_POOL: tuple[tuple, NerPool] | None = None
+
+# NOTE: number of unfinished iterators using each pool, so that a pool is
+# never closed while it is still being used, even if it is not cached anymore
+NER_POOL_USERS: dict[NerPool, int] = {}
+
+
+def close_ner_pool_if_unused(pool: NerPool) -> None:
+    if CACHED_NER_POOL is not None and CACHED_NER_POOL[1] is pool:
+        return
+
+    if NER_POOL_USERS.get(pool, 0) > 0:
+        return
+
+    pool.__exit__(None, None, None)
+
+
+def close_ner_pools() -> None:
+    global CACHED_NER_POOL
+
+    pools = list(NER_POOL_USERS)
+
+    if CACHED_NER_POOL is not None:
+        pools.append(CACHED_NER_POOL[1])
+
+    CACHED_NER_POOL = None
+    NER_POOL_USERS.clear()
+
+    for pool in pools:
+        pool.__exit__(None, None, None)
+
+
+atexit.register(close_ner_pools)
+
+
+def acquire_ner_pool(args: NerArgs) -> NerPool:
+    global CACHED_NER_POOL
+
+    resource_plan = plan_resources(args.processes)
+    apply_resource_plan(resource_plan)
+
+    processes = resource_plan.processes
+    key = (args.lang, args.model_size, processes, args.batch_size, args.max_models)
+
+    if CACHED_NER_POOL is None or CACHED_NER_POOL[0] != key:
+        previous = CACHED_NER_POOL
+
+        CACHED_NER_POOL = (
+            key,
+            NerPool(
+                args.lang,
+                args.model_size,
+                processes=processes,
+                batch_size=args.batch_size,
+                max_models=args.max_models,
+            ).__enter__(),
+        )
+
+        if previous is not None:
+            close_ner_pool_if_unused(previous[1])
+
+    pool = CACHED_NER_POOL[1]
+    NER_POOL_USERS[pool] = NER_POOL_USERS.get(pool, 0) + 1
+
+    return pool
+
+
+def release_ner_pool(pool: NerPool) -> None:
+    users = NER_POOL_USERS.get(pool, 0) - 1
+
+    if users > 0:
+        NER_POOL_USERS[pool] = users
+        return
+
+    NER_POOL_USERS.pop(pool, None)
+    close_ner_pool_if_unused(pool)
+
+
+def ner(texts: Iterable[str], **kwargs) -> Iterator[Entities]:
+    args = bind_kwargs_to_args(NerArgs, NER_API_ARGS, **kwargs)
+
+    def iterate():
+        pool = acquire_ner_pool(args)
+
+        try:
+            for entities, _ in pool.imap(
+                ((text, None) for text in texts), max_latency=args.max_latency
+            ):
+                yield entities
+        finally:
+            release_ner_pool(pool)
+
+    return iterate()
+
+
+def embed(texts: Iterable[str], **kwargs) -> "np.ndarray":
+    import numpy as np
+
+    from .embedding_models import acquire_sentence_transformer
+
+    args = bind_kwargs_to_args(EmbedArgs, EMBED_API_ARGS, **kwargs)
+    apply_resource_plan(plan_resources())
+
+    transformer = acquire_sentence_transformer(args.model)
+
+    embedding_size = transformer.get_sentence_embedding_dimension()
+
+    assert embedding_size is not None
+
+    batches = [
+        transformer.encode(chunk, batch_size=args.batch_size)
+        for chunk in as_latency_bounded_chunks(args.batch_size, texts, args.max_latency)
+    ]
+
+    if not batches:
+        return np.empty((0, embedding_size), dtype=np.float32)
+
+    return np.concatenate(batches)
+
+
+def cluster(embeddings: "np.ndarray", **kwargs) -> "np.ndarray":
+    import numpy as np
+
+    from .clustering import (
+        check_matrix,
+        fit_kmeans,
+        iter_kmeans_labels,
+        iter_matrix_batches,
+        iter_near_duplicate_labels,
+    )
+
+    args = bind_kwargs_to_args(ClusterArgs, CLUSTER_API_ARGS, **kwargs)
+    args.resolve()
+
+    check_matrix(embeddings)
+
+    if args.threshold is not None:
+        labels = list(
+            iter_near_duplicate_labels(
+                iter_matrix_batches(embeddings, args.batch_size),
+                args.threshold,
+                args.max_leaders,
+            )
+        )
+
+    elif embeddings.shape[0] == 0:
+        labels = []
+
+    else:
+        kmeans = fit_kmeans(
+            embeddings,
+            args.clusters,
+            args.batch_size,
+            args.epochs,
+            normalize=args.normalize,
+            seed=args.seed,
+        )
+        labels = list(iter_kmeans_labels(kmeans, embeddings, args.batch_size))
+
+    if not labels:
+        return np.empty(0, dtype=np.int64)
+
+    return np.concatenate(labels)
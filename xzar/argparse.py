@@ -16,11 +16,14 @@ from typing import (
 
 import sys
 import argparse
+from numbers import Integral, Real
 from rich_argparse import RichHelpFormatter
 from dataclasses import dataclass
 from casanova import RowCountResumer
 
-from .exceptions import ResolvingError
+from .exceptions import ArgumentValidationError, ResolvingError
+from .loading_bar import ProgressMode, set_progress_mode
+from .resources import plan_resources, apply_resource_plan, log_resource_plan
 from .utils import acquire_cross_platform_stdout
 
 # Typed argparse workflow:
@@ -107,10 +110,12 @@ class Arg:
 
 
 class ImplicitInputArg(Arg):
-    def __init__(self):
+    def __init__(
+        self, help: str = "path to CSV file input. Will default to stdin if not given."
+    ):
         self.nargs = "?"
         self.default = "-"
-        self.help = "path to CSV file input. Will default to stdin if not given."
+        self.help = help
         self.positional = True
 
 
@@ -121,6 +126,17 @@ class ImplicitOutputArg(Arg):
         self.default = "-"
 
 
+def validate_max_latency(t: float | None):
+    if t is not None and t <= 0:
+        raise ArgumentValidationError("--max-latency should be positive!")
+
+
+class MaxLatencyArg(Arg):
+    def __init__(self):
+        self.help = "maximum number of seconds a row can wait for its batch to be filled before being processed anyway, in which case output will also be flushed after each batch. Useful when reading a live stream from stdin."
+        self.validate = validate_max_latency
+
+
 T = TypeVar("T")
 
 
@@ -166,7 +182,9 @@ def create_parser(
                 if arg.default is not None and not isinstance(
                     arg, (ImplicitOutputArg, ImplicitInputArg)
                 ):
-                    subparser_kwargs["help"] += ' Defaults to "{}".'.format(arg.default)
+                    subparser_kwargs["help"] += ' Defaults to "{}".'.format(
+                        str(arg.default).replace("%", "%%")
+                    )
 
             if origin is int or get_optional_type(origin) is int:
                 subparser_kwargs["type"] = int
@@ -201,6 +219,9 @@ class TypedArgs:
     def resolve(self):
         raise NotImplementedError
 
+    def internal_release(self):
+        raise NotImplementedError
+
 
 class TypicalTypedArgs(TypedArgs):
     total: Annotated[
@@ -209,8 +230,27 @@ class TypicalTypedArgs(TypedArgs):
             help="total number of items to process. Might be necessary when you want to display a finite progress indicator for large files given as input to the command."
         ),
     ]
+    no_count: Annotated[
+        bool,
+        Arg(
+            help="whether to skip counting the rows of the input file in the background, which is used to display a finite progress indicator when --total is not given. Counts are cached next to the file."
+        ),
+    ]
+    progress: Annotated[
+        ProgressMode,
+        Arg(
+            help="how to report progress. `bar` displays a progress bar, `json` periodically prints progress as JSON lines on stderr and `none` disables progress reporting. `auto` will display a bar when stderr is a terminal and JSON lines otherwise.",
+            default="auto",
+        ),
+    ]
     output: Annotated[IO[str], ImplicitOutputArg()]
 
+    def open_input(self, input_path: str) -> Any:
+        if input_path == "-":
+            return sys.stdin
+
+        return open(input_path, "r", encoding="utf-8")
+
     def internal_resolve(self):
         try:
             input_path = cast(str, getattr(self, "input"))
@@ -221,6 +261,17 @@ class TypicalTypedArgs(TypedArgs):
 
         output_path = cast(str, getattr(self, "output"))
 
+        set_progress_mode(getattr(self, "progress"))
+
+        # NOTE: resources must be planned before any heavy library is imported
+        # so that thread counts can be applied through the environment
+        resource_plan = plan_resources(getattr(self, "processes", 1))
+        apply_resource_plan(resource_plan)
+        log_resource_plan(resource_plan)
+
+        if hasattr(self, "processes"):
+            setattr(self, "processes", resource_plan.processes)
+
         resuming_io = None
 
         if hasattr(self, "resume") and getattr(self, "resume"):
@@ -231,10 +282,7 @@ class TypicalTypedArgs(TypedArgs):
 
             resuming_io = RowCountResumer(output_path)
 
-        if input_path == "-":
-            input_io = sys.stdin
-        else:
-            input_io = open(input_path, "r", encoding="utf-8")
+        input_io = self.open_input(input_path)
 
         if output_path == "-":
             output_io = acquire_cross_platform_stdout()
@@ -246,6 +294,19 @@ class TypicalTypedArgs(TypedArgs):
         setattr(self, "input", input_io)
         setattr(self, "output", output_io)
 
+    def internal_release(self):
+        # NOTE: the files opened when resolving must be closed, so that their
+        # content is fully written when xzar is run in-process
+        for name in ["input", "output"]:
+            io = getattr(self, name, None)
+
+            if io is sys.stdin or io is sys.stdout:
+                io.flush()
+                continue
+
+            if hasattr(io, "close"):
+                io.close()
+
 
 def bind_namespace_to_args(namespace: argparse.Namespace, args_class: Type[T]) -> T:
     args = args_class()
@@ -269,6 +330,76 @@ def bind_namespace_to_args(namespace: argparse.Namespace, args_class: Type[T]) -
     return args
 
 
+def coerce_kwarg(name: str, value: Any, origin: Type) -> Any:
+    # NOTE: argparse enforces choices and numeric types on the command line,
+    # so we need to do the same for kwargs given through the python API
+    optional_type = get_optional_type(origin)
+
+    if optional_type is not None:
+        if value is None:
+            return value
+
+        origin = optional_type
+
+    if get_origin(origin) is Literal:
+        choices = get_args(origin)
+
+        if value not in choices:
+            raise ArgumentValidationError(
+                "{} should be one of {}!".format(
+                    name, ", ".join('"{}"'.format(c) for c in choices)
+                )
+            )
+
+    elif origin is int:
+        if isinstance(value, bool) or not isinstance(value, Integral):
+            raise ArgumentValidationError("{} should be an int!".format(name))
+
+        value = int(value)
+
+    elif origin is float:
+        if isinstance(value, bool) or not isinstance(value, Real):
+            raise ArgumentValidationError("{} should be a number!".format(name))
+
+        value = float(value)
+
+    return value
+
+
+def bind_kwargs_to_args(
+    args_class: Type[T], only: Iterable[str] | None = None, /, **kwargs
+) -> T:
+    args = args_class()
+    hints = get_arg_type_hints(args_class)
+
+    # NOTE: arguments not listed in `only` are not accepted as kwargs and
+    # will always be bound to their default value
+    if only is not None:
+        only = set(only)
+
+    for name, (hint, origin) in hints.items():
+        if name in kwargs and (only is None or name in only):
+            value = kwargs.pop(name)
+        else:
+            value = False if origin is bool else hint.default
+
+        value = coerce_kwarg(name, value, origin)
+
+        if hint.validate is not None:
+            hint.validate(value)
+
+        setattr(args, name, value)
+
+    if kwargs:
+        raise TypeError(
+            "unknown argument(s) for {}: {}".format(
+                args_class.__name__, ", ".join(kwargs)
+            )
+        )
+
+    return args
+
+
 def resolve(args: TypedArgs):
     try:
         args.internal_resolve()
@@ -281,6 +412,13 @@ def resolve(args: TypedArgs):
         pass
 
 
+def release(args: TypedArgs):
+    try:
+        args.internal_release()
+    except NotImplementedError:
+        pass
+
+
 # Tests
 if __name__ == "__main__":
     Lang = Literal["fr", "en"]
@@ -0,0 +1,262 @@
+from typing import Callable, Iterable, Iterator
+
+import numpy as np
+
+# Streaming clustering over embedding matrices:
+#   - the mini-batch k-means implementation follows Sculley's "Web-scale
+#     k-means clustering" with per-centroid learning rates, vectorized
+#     so that one update costs a single matrix product per batch.
+#   - near-duplicate grouping is a leader clustering where each row joins
+#     the group of its most similar representative if it is similar enough,
+#     or becomes a new representative itself. The set of representatives is
+#     bounded and the least recently matched ones are forgotten first.
+#
+# Both only ever hold a batch of rows and their own state in memory, which
+# means the matrices can be memory-mapped from disk.
+
+
+def check_matrix(matrix: np.ndarray) -> None:
+    if matrix.ndim != 2:
+        raise ValueError("embeddings should be a 2-dimensional matrix!")
+
+
+def iter_matrix_batches(matrix: np.ndarray, batch_size: int) -> Iterator[np.ndarray]:
+    for i in range(0, matrix.shape[0], batch_size):
+        yield np.asarray(matrix[i : i + batch_size], dtype=np.float32)
+
+
+def l2_normalize(batch: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(batch, axis=1, keepdims=True)
+    norms[norms == 0] = 1
+
+    return batch / norms
+
+
+def sample_rows(matrix: np.ndarray, size: int, rng: np.random.Generator) -> np.ndarray:
+    n = matrix.shape[0]
+
+    if size >= n:
+        return np.asarray(matrix, dtype=np.float32)
+
+    # NOTE: sorting the indices keeps reads sequential on memory-mapped files
+    indices = np.sort(rng.choice(n, size=size, replace=False))
+
+    return np.asarray(matrix[indices], dtype=np.float32)
+
+
+def kmeans_plusplus(sample: np.ndarray, k: int, rng: np.random.Generator) -> np.ndarray:
+    n = sample.shape[0]
+    centroids = np.empty((k, sample.shape[1]), dtype=np.float32)
+
+    centroids[0] = sample[rng.integers(n)]
+    closest = ((sample - centroids[0]) ** 2).sum(axis=1, dtype=np.float64)
+
+    for i in range(1, k):
+        potential = closest.sum()
+
+        if potential > 0:
+            chosen = rng.choice(n, p=closest / potential)
+        else:
+            chosen = rng.integers(n)
+
+        centroids[i] = sample[chosen]
+        np.minimum(
+            closest,
+            ((sample - centroids[i]) ** 2).sum(axis=1, dtype=np.float64),
+            out=closest,
+        )
+
+    return centroids
+
+
+class MiniBatchKMeans:
+    def __init__(self, k: int, normalize: bool = False, seed: int | None = None):
+        self.k = k
+        self.normalize = normalize
+        self.rng = np.random.default_rng(seed)
+        self.centroids: np.ndarray | None = None
+        self.counts = np.zeros(k, dtype=np.int64)
+
+    def init(self, matrix: np.ndarray, init_size: int) -> None:
+        sample = sample_rows(matrix, max(init_size, 3 * self.k), self.rng)
+
+        if self.normalize:
+            sample = l2_normalize(sample)
+
+        if sample.shape[0] < self.k:
+            raise ValueError(
+                "cannot find {} clusters in {} rows!".format(self.k, sample.shape[0])
+            )
+
+        self.centroids = kmeans_plusplus(sample, self.k, self.rng)
+
+    # NOTE: expects the batch to be already normalized, when needed
+    def assign(self, batch: np.ndarray) -> np.ndarray:
+        assert self.centroids is not None
+
+        # ||x - c||² = ||x||² - 2x.c + ||c||², and since ||x||² is the same
+        # for every centroid, it can be dropped when looking for the argmin
+        scores = batch @ self.centroids.T
+        scores *= -2
+        scores += (self.centroids**2).sum(axis=1)
+
+        return scores.argmin(axis=1)
+
+    def predict(self, batch: np.ndarray) -> np.ndarray:
+        if self.normalize:
+            batch = l2_normalize(batch)
+
+        return self.assign(batch)
+
+    def partial_fit(self, batch: np.ndarray) -> None:
+        assert self.centroids is not None
+
+        if self.normalize:
+            batch = l2_normalize(batch)
+
+        labels = self.assign(batch)
+
+        batch_counts = np.bincount(labels, minlength=self.k)
+        batch_sums = np.zeros_like(self.centroids)
+        np.add.at(batch_sums, labels, batch)
+
+        # Each centroid moves towards the mean of its newly assigned rows
+        # with a learning rate of 1 / number of rows it has seen so far
+        seen = batch_counts > 0
+        self.counts[seen] += batch_counts[seen]
+        self.centroids[seen] += (
+            batch_sums[seen] - batch_counts[seen, None] * self.centroids[seen]
+        ) / self.counts[seen, None]
+
+
+class NearDuplicateGrouper:
+    def __init__(self, threshold: float, max_leaders: int):
+        self.threshold = threshold
+        self.max_leaders = max_leaders
+
+        self.leaders: np.ndarray | None = None
+        self.leader_groups = np.empty(max_leaders, dtype=np.int64)
+        self.leader_last_hit = np.empty(max_leaders, dtype=np.int64)
+        self.size = 0
+
+        self.group_count = 0
+        self.clock = 0
+
+    def add_leaders(self, vectors: np.ndarray, groups: np.ndarray) -> None:
+        if self.leaders is None:
+            self.leaders = np.empty(
+                (self.max_leaders, vectors.shape[1]), dtype=np.float32
+            )
+
+        if vectors.shape[0] > self.max_leaders:
+            vectors = vectors[-self.max_leaders :]
+            groups = groups[-self.max_leaders :]
+
+        count = vectors.shape[0]
+        free = self.max_leaders - self.size
+
+        if count <= free:
+            slots = np.arange(self.size, self.size + count)
+            self.size += count
+        else:
+            evicted = count - free
+            least_recent = np.argpartition(
+                self.leader_last_hit[: self.size], evicted - 1
+            )[:evicted]
+            slots = np.concatenate(
+                (np.arange(self.size, self.max_leaders), least_recent)
+            )
+            self.size = self.max_leaders
+
+        self.leaders[slots] = vectors
+        self.leader_groups[slots] = groups
+        self.leader_last_hit[slots] = self.clock
+
+    def group(self, batch: np.ndarray) -> np.ndarray:
+        batch = l2_normalize(batch)
+        labels = np.full(batch.shape[0], -1, dtype=np.int64)
+
+        if self.size > 0:
+            assert self.leaders is not None
+
+            similarities = batch @ self.leaders[: self.size].T
+            best = similarities.argmax(axis=1)
+            matched = similarities[np.arange(batch.shape[0]), best] >= self.threshold
+
+            labels[matched] = self.leader_groups[best[matched]]
+            self.leader_last_hit[best[matched]] = self.clock
+
+        pending = np.flatnonzero(labels < 0)
+
+        if pending.size > 0:
+            candidates = batch[pending]
+            similarities = candidates @ candidates.T
+
+            new_leaders = []
+            new_groups = []
+
+            for i, row in enumerate(pending):
+                if labels[row] >= 0:
+                    continue
+
+                group = self.group_count
+                self.group_count += 1
+
+                followers = pending[i:][
+                    (similarities[i, i:] >= self.threshold) & (labels[pending[i:]] < 0)
+                ]
+                labels[followers] = group
+                labels[row] = group
+
+                new_leaders.append(i)
+                new_groups.append(group)
+
+            self.add_leaders(candidates[new_leaders], np.array(new_groups))
+
+        self.clock += 1
+
+        return labels
+
+
+# Shared by the `cluster` command and the library API
+def fit_kmeans(
+    matrix: np.ndarray,
+    k: int,
+    batch_size: int,
+    epochs: int,
+    normalize: bool = False,
+    seed: int | None = None,
+    on_batch: Callable[[int], None] | None = None,
+) -> MiniBatchKMeans:
+    n = matrix.shape[0]
+
+    if n < k:
+        raise ValueError("cannot find {} clusters in only {} rows!".format(k, n))
+
+    kmeans = MiniBatchKMeans(k, normalize=normalize, seed=seed)
+    kmeans.init(matrix, batch_size)
+
+    for _ in range(epochs):
+        for batch in iter_matrix_batches(matrix, batch_size):
+            kmeans.partial_fit(batch)
+
+            if on_batch is not None:
+                on_batch(batch.shape[0])
+
+    return kmeans
+
+
+def iter_kmeans_labels(
+    kmeans: MiniBatchKMeans, matrix: np.ndarray, batch_size: int
+) -> Iterator[np.ndarray]:
+    for batch in iter_matrix_batches(matrix, batch_size):
+        yield kmeans.predict(batch)
+
+
+def iter_near_duplicate_labels(
+    batches: Iterable[np.ndarray], threshold: float, max_leaders: int
+) -> Iterator[np.ndarray]:
+    grouper = NearDuplicateGrouper(threshold, max_leaders)
+
+    for batch in batches:
+        yield grouper.group(batch)
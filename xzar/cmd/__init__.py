@@ -3,11 +3,13 @@ from ..argparse import SubCommand
 from .ner import NerArgs, ner
 from .tokenize import TokenizeArgs, tokenize
 from .embed import EmbedArgs, embed
+from .cluster import ClusterArgs, cluster
 
 SUBCOMMANDS = [
     SubCommand("ner", args=NerArgs, fn=ner),
     SubCommand("tokenize", args=TokenizeArgs, fn=tokenize),
     SubCommand("embed", args=EmbedArgs, fn=embed),
+    SubCommand("cluster", args=ClusterArgs, fn=cluster),
 ]
 
 __all__ = ["SUBCOMMANDS"]
@@ -0,0 +1,255 @@
+from typing import Annotated, Any, IO
+
+import sys
+import casanova
+
+from ..argparse import TypicalTypedArgs, Arg, ImplicitInputArg
+from ..console import console
+from ..exceptions import ArgumentValidationError, ResolvingError
+from ..loading_bar import LoadingBar
+
+
+def validate_clusters(k: int | None):
+    if k is not None and k < 1:
+        raise ArgumentValidationError("-k/--clusters should be positive!")
+
+
+def validate_threshold(t: float | None):
+    if t is not None and not -1 <= t <= 1:
+        raise ArgumentValidationError("-t/--threshold should be between -1 and 1!")
+
+
+def validate_batch_size(b: int):
+    if b < 1:
+        raise ArgumentValidationError("-B/--batch-size should be positive!")
+
+
+def validate_epochs(e: int):
+    if e < 1:
+        raise ArgumentValidationError("--epochs should be positive!")
+
+
+def validate_max_leaders(m: int):
+    if m < 1:
+        raise ArgumentValidationError("--max-leaders should be positive!")
+
+
+class ClusterArgs(TypicalTypedArgs):
+    input: Annotated[
+        IO[str],
+        ImplicitInputArg(
+            help="path to CSV file input, as output by `xzar embed`, or to a .npy file containing the embeddings. Will default to stdin if not given."
+        ),
+    ]
+    clusters: Annotated[
+        int | None,
+        Arg(
+            "-k",
+            help="number of clusters to find using mini-batch k-means.",
+            validate=validate_clusters,
+        ),
+    ]
+    threshold: Annotated[
+        float | None,
+        Arg(
+            "-t",
+            help="cosine similarity above which rows will be grouped together as near-duplicates. Cannot be used with -k/--clusters.",
+            validate=validate_threshold,
+        ),
+    ]
+    column_prefix: Annotated[
+        str,
+        Arg(
+            help="prefix used to identify embedding columns in the input CSV file",
+            default="dim_",
+        ),
+    ]
+    batch_size: Annotated[
+        int,
+        Arg(
+            "-B",
+            help="number of rows to process at once.",
+            default=1024,
+            validate=validate_batch_size,
+        ),
+    ]
+    epochs: Annotated[
+        int,
+        Arg(
+            help="number of passes over the data used to fit the k-means centroids.",
+            default=3,
+            validate=validate_epochs,
+        ),
+    ]
+    normalize: Annotated[
+        bool,
+        Arg(
+            help="whether to L2-normalize the embeddings before running k-means, so that clusters are based on cosine similarity."
+        ),
+    ]
+    max_leaders: Annotated[
+        int,
+        Arg(
+            help="maximum number of group representatives kept in memory when using -t/--threshold. Least recently matched ones are forgotten first.",
+            default=50_000,
+            validate=validate_max_leaders,
+        ),
+    ]
+    seed: Annotated[
+        int,
+        Arg(help="seed of the random number generator used by k-means.", default=0),
+    ]
+
+    def open_input(self, input_path: str) -> Any:
+        if not input_path.endswith(".npy"):
+            return super().open_input(input_path)
+
+        import numpy as np
+
+        from ..clustering import check_matrix
+
+        try:
+            matrix = np.load(input_path, mmap_mode="r")
+            check_matrix(matrix)
+        except (OSError, ValueError) as e:
+            raise ResolvingError("could not read {}: {}".format(input_path, e))
+
+        return matrix
+
+    def resolve(self):
+        if (self.clusters is None) == (self.threshold is None):
+            raise ResolvingError(
+                "exactly one of -k/--clusters or -t/--threshold is required!"
+            )
+
+
+def iter_csv_batches(args: ClusterArgs, reader: casanova.Reader, batch_size: int):
+    import numpy as np
+    from ebbe import as_chunks
+
+    # NOTE: empty input, in which case only the header will be written
+    if reader.fieldnames is None:
+        return
+
+    positions = [
+        i for i, h in enumerate(reader.fieldnames) if h.startswith(args.column_prefix)
+    ]
+
+    if not positions:
+        console.print(
+            '[red]could not find any column starting with "{}" in input CSV file!'.format(
+                args.column_prefix
+            )
+        )
+        sys.exit(1)
+
+    for chunk in as_chunks(batch_size, reader):
+        yield np.array([[row[i] for i in positions] for row in chunk], dtype=np.float32)
+
+
+def spool_to_memmap(batches) -> Any:
+    import numpy as np
+    from tempfile import TemporaryFile
+
+    spool = TemporaryFile()
+    n = 0
+    dimensions = 0
+
+    for batch in batches:
+        spool.write(batch.tobytes())
+        n += batch.shape[0]
+        dimensions = batch.shape[1]
+
+    spool.flush()
+
+    if n == 0:
+        return np.empty((0, dimensions), dtype=np.float32)
+
+    return np.memmap(spool, dtype=np.float32, mode="r", shape=(n, dimensions))
+
+
+def cluster(args: ClusterArgs):
+    import numpy as np
+
+    from ..clustering import (
+        fit_kmeans,
+        iter_kmeans_labels,
+        iter_matrix_batches,
+        iter_near_duplicate_labels,
+    )
+
+    writer = casanova.Writer(args.output, fieldnames=["cluster"])
+
+    def write_labels(labels):
+        writer.writerows([label] for label in labels.tolist())
+
+    if isinstance(args.input, np.ndarray):
+        reader = None
+        matrix = args.input
+    else:
+        reader = casanova.Reader(args.input, total=args.total)
+        matrix = None
+
+    def count_in_background(loading_bar: LoadingBar):
+        if reader is not None and reader.total is None and not args.no_count:
+            loading_bar.count_in_background(reader.input_file)
+
+    # Near-duplicates grouping only needs a single pass over the data
+    if args.threshold is not None:
+        if reader is not None:
+            batches = iter_csv_batches(args, reader, args.batch_size)
+            total = reader.total
+        else:
+            batches = iter_matrix_batches(matrix, args.batch_size)
+            total = matrix.shape[0]
+
+        with LoadingBar("Grouping", total=total) as loading_bar:
+            count_in_background(loading_bar)
+
+            for labels in iter_near_duplicate_labels(
+                batches, args.threshold, args.max_leaders
+            ):
+                write_labels(labels)
+                loading_bar.advance(labels.shape[0])
+
+        return
+
+    # K-means needs several passes, so CSV input is first spooled to
+    # a temporary memory-mapped file
+    if reader is not None:
+        with LoadingBar("Reading", total=reader.total) as loading_bar:
+            count_in_background(loading_bar)
+
+            def spooled_batches():
+                for batch in iter_csv_batches(args, reader, args.batch_size):
+                    yield batch
+                    loading_bar.advance(batch.shape[0])
+
+            matrix = spool_to_memmap(spooled_batches())
+
+    assert matrix is not None
+
+    n = matrix.shape[0]
+
+    if n == 0:
+        return
+
+    with LoadingBar("Clustering", total=n * args.epochs) as loading_bar:
+        try:
+            kmeans = fit_kmeans(
+                matrix,
+                args.clusters,
+                args.batch_size,
+                args.epochs,
+                normalize=args.normalize,
+                seed=args.seed,
+                on_batch=loading_bar.advance,
+            )
+        except ValueError as e:
+            console.print("[red]" + str(e))
+            sys.exit(1)
+
+    with LoadingBar("Assigning", total=n) as loading_bar:
+        for labels in iter_kmeans_labels(kmeans, matrix, args.batch_size):
+            write_labels(labels)
+            loading_bar.advance(labels.shape[0])
@@ -1,9 +1,33 @@
-from typing import Annotated, IO
+from typing import Annotated, IO, TYPE_CHECKING
+
+import csv
+from types import SimpleNamespace
 from casanova import Enricher
-from ebbe import as_chunks
+from casanova.utils import strip_null_bytes_from_row
 
-from ..argparse import TypicalTypedArgs, Arg, ImplicitInputArg
+from ..argparse import TypicalTypedArgs, Arg, ImplicitInputArg, MaxLatencyArg
+from ..exceptions import ArgumentValidationError
+from ..embedding_models import DEFAULT_EMBEDDING_MODEL, acquire_sentence_transformer
 from ..loading_bar import LoadingBar
+from ..utils import as_latency_bounded_chunks
+
+if TYPE_CHECKING:
+    import numpy as np
+
+
+def validate_float_format(float_format: str):
+    # NOTE: formatted values are written as is in the CSV output, so they
+    # must not contain anything that would need quoting
+    try:
+        formatted = float_format % -1.5
+        float(formatted)
+    except (TypeError, ValueError):
+        formatted = None
+
+    if formatted is None or any(c in formatted for c in ',"\r\n'):
+        raise ArgumentValidationError(
+            '--float-format should be a printf-style format for a single float, e.g. "%.6g"!'
+        )
 
 
 class EmbedArgs(TypicalTypedArgs):
@@ -29,7 +53,7 @@ class EmbedArgs(TypicalTypedArgs):
             help="sentence-transformers model name in the Hugging Face hub "
             "(https://huggingface.co/models?library=sentence-transformers) "
             "or path to a model on disc.",
-            default="ibm-granite/granite-embedding-107m-multilingual",
+            default=DEFAULT_EMBEDDING_MODEL,
         ),
     ]
     npy: Annotated[
@@ -40,6 +64,15 @@ class EmbedArgs(TypicalTypedArgs):
         int,
         Arg("-B", help="number of documents to process at once.", default=128),
     ]
+    float_format: Annotated[
+        str,
+        Arg(
+            help='printf-style format used to write embedding values in the CSV output. The default one is lossless for float32 values, use something like "%%.6g" to get smaller files',
+            default="%.9g",
+            validate=validate_float_format,
+        ),
+    ]
+    max_latency: Annotated[float | None, MaxLatencyArg()]
     resume: Annotated[
         bool,
         Arg(
@@ -48,10 +81,46 @@ class EmbedArgs(TypicalTypedArgs):
     ]
 
 
-def embed(args: EmbedArgs):
-    from sentence_transformers import SentenceTransformer
+def format_embedding_rows(
+    rows: list[list[str]],
+    embeddings: "np.ndarray",
+    float_format: str,
+    lineterminator: str = "\r\n",
+    strip_null_bytes: bool = False,
+) -> str:
+    # NOTE: all the floats of the batch are formatted by a single % operation,
+    # then interleaved with the original rows
+    embedding_format = ",".join([float_format] * embeddings.shape[1]) + "\n"
+    formatted_embeddings = (embedding_format * embeddings.shape[0]) % tuple(
+        embeddings.ravel().tolist()
+    )
 
-    transformer = SentenceTransformer(args.model)
+    # NOTE: the csv writer writes each row with a single call, and its line
+    # terminator is then replaced by the delimiter so the row can be followed
+    # by the embeddings. The terminator must contain both "\r" and "\n" since
+    # the csv writer only quotes cells containing one of its characters
+    parts: list[str] = []
+    row_writer = csv.writer(SimpleNamespace(write=parts.append), lineterminator="\r\n")
+
+    for row, formatted_embedding in zip(rows, formatted_embeddings.splitlines()):
+        if strip_null_bytes:
+            row = strip_null_bytes_from_row(row)
+
+        # NOTE: the csv writer would quote a row made of a single empty cell
+        if len(row) == 1 and not row[0]:
+            parts.append(",")
+        else:
+            row_writer.writerow(row)
+            parts[-1] = parts[-1][:-2] + ","
+
+        parts.append(formatted_embedding)
+        parts.append(lineterminator)
+
+    return "".join(parts)
+
+
+def embed(args: EmbedArgs):
+    transformer = acquire_sentence_transformer(args.model)
 
     embedding_size = transformer.get_sentence_embedding_dimension()
 
@@ -64,13 +133,35 @@ def embed(args: EmbedArgs):
             add=[args.column_prefix + str(i) for i in range(embedding_size)],
         )
 
-    with LoadingBar.from_enricher(enricher, "Embedding", args.total) as loading_bar:
-        for chunk in as_chunks(
-            args.batch_size, enricher.cells(args.column, with_rows=True)
+    # NOTE: rows are written in blocks directly to the output file, which is
+    # the one the enricher writes to, since it already wrote the header
+    output_file = (
+        enricher.resumer.output_file if enricher.resumer is not None else args.output
+    )
+    lineterminator = enricher.writer.lineterminator or "\r\n"
+
+    with LoadingBar.from_enricher(
+        enricher, "Embedding", args.total, count=not args.no_count
+    ) as loading_bar:
+        for chunk in as_latency_bounded_chunks(
+            args.batch_size,
+            enricher.cells(args.column, with_rows=True),
+            args.max_latency,
         ):
             embeddings = transformer.encode(
                 [c[1] for c in chunk], batch_size=args.batch_size
             )
-            for row, embedding in zip(chunk, embeddings):
-                enricher.writerow(row[0], embedding)
-                loading_bar.advance()
+            output_file.write(
+                format_embedding_rows(
+                    [c[0] for c in chunk],
+                    embeddings,
+                    args.float_format,
+                    lineterminator=lineterminator,
+                    strip_null_bytes=enricher.strip_null_bytes_on_write,
+                )
+            )
+
+            loading_bar.advance(len(chunk))
+
+            if args.max_latency is not None:
+                args.output.flush()
@@ -1,12 +1,15 @@
 from typing import Annotated, IO
 
+import sys
 import casanova
 from casanova.headers import Selection, SingleColumn
 
-from ..argparse import TypicalTypedArgs, Arg, ImplicitInputArg
+from ..argparse import TypicalTypedArgs, Arg, ImplicitInputArg, MaxLatencyArg
+from ..console import console
 from ..exceptions import ArgumentValidationError
 from ..loading_bar import LoadingBar
-from ..spacy_models import SpacyLang, SpacyModelSize, acquire_model
+from ..ner_pool import NerPool
+from ..spacy_models import SpacyLang, SpacyModelSize, parse_spacy_lang
 
 
 def validate_processes(p: int):
@@ -14,6 +17,11 @@ def validate_processes(p: int):
         raise ArgumentValidationError("-p/--processes should be positive or -1!")
 
 
+def validate_max_models(n: int):
+    if n < 1:
+        raise ArgumentValidationError("--max-models should be positive!")
+
+
 class NerArgs(TypicalTypedArgs):
     column: Annotated[
         str,
@@ -39,19 +47,32 @@ class NerArgs(TypicalTypedArgs):
         int,
         Arg(
             "-p",
-            help="number of processes to use. Set to -1 to select a number of processes based on the currently available CPUs.",
-            default="1",
+            help="number of processes to use. Set to -1 to select a number of processes based on the currently available CPUs, taking CPU affinity and cgroup quotas into account.",
+            default=1,
             validate=validate_processes,
         ),
     ]
     batch_size: Annotated[
         int | None, Arg("-B", help="number of documents to process at once.")
     ]
+    lang_column: Annotated[
+        str | None,
+        Arg(
+            help="column of CSV file containing the language of each row, used to route it to the relevant spacy model. Rows in an unsupported language will use the model selected by -l/--lang.",
+        ),
+    ]
+    max_models: Annotated[
+        int,
+        Arg(
+            help="maximum number of spacy models kept loaded at once by each process when using --lang-column. Least recently used ones are unloaded first.",
+            default=3,
+            validate=validate_max_models,
+        ),
+    ]
+    max_latency: Annotated[float | None, MaxLatencyArg()]
 
 
 def ner(args: NerArgs):
-    nlp = acquire_model(args.lang, args.model_size, ["ner"])
-
     selection = Selection(inverted=True)
     selection.add(SingleColumn(args.column))
 
@@ -59,20 +80,55 @@ def ner(args: NerArgs):
         args.input, args.output, add=["entity", "entity_type"], select=selection
     )
 
+    if args.lang_column is not None:
+        if enricher.headers is None or args.lang_column not in enricher.headers:
+            console.print(
+                '[red]could not find the "{}" column in input CSV file!'.format(
+                    args.lang_column
+                )
+            )
+            sys.exit(1)
+
     def tuples():
         for row, text in enricher.cells(args.column, with_rows=True):
             yield text, row
 
-    with LoadingBar.from_enricher(
-        enricher, "Extracting", total=args.total
-    ) as loading_bar:
-        for doc, row in nlp.pipe(
-            tuples(),
-            as_tuples=True,
-            n_process=args.processes,
-            batch_size=args.batch_size,
-        ):
-            for entity in doc.ents:
-                enricher.writerow(row, [entity.text, entity.label_])
-
-            loading_bar.advance()
+    def routed_tuples():
+        assert enricher.headers is not None
+
+        text_pos = enricher.headers[args.column]
+        lang_pos = enricher.headers[args.lang_column]
+
+        for row in enricher:
+            yield row[text_pos], parse_spacy_lang(row[lang_pos]), row
+
+    pool = NerPool(
+        args.lang,
+        args.model_size,
+        processes=args.processes,
+        batch_size=args.batch_size,
+        max_models=args.max_models,
+    )
+
+    if args.lang_column is not None:
+        batches = pool.imap_routed_batches(
+            routed_tuples(), max_latency=args.max_latency
+        )
+    else:
+        batches = pool.imap_batches(tuples(), max_latency=args.max_latency)
+
+    with (
+        pool,
+        LoadingBar.from_enricher(
+            enricher, "Extracting", total=args.total, count=not args.no_count
+        ) as loading_bar,
+    ):
+        for batch in batches:
+            for entities, row in batch:
+                for entity in entities:
+                    enricher.writerow(row, entity)
+
+            loading_bar.advance(len(batch))
+
+            if args.max_latency is not None:
+                args.output.flush()
@@ -0,0 +1,93 @@
+import os
+import json
+import mmap
+
+# Counting CSV records fast enough to be done before processing a file:
+#   - the file is memory-mapped and scanned by chunks using numpy, looking
+#     for newlines and quote chars.
+#   - a newline ends a record only when it is preceded by an even number of
+#     quote chars since the start of the file (escaped quotes being doubled,
+#     they don't change the parity). So we only need to count the quote
+#     chars found before each newline, which a binary search gives us.
+#   - counts are cached in a hidden file next to the counted one, keyed by
+#     its size and modification time, so that reruns don't need to scan.
+
+CHUNK_SIZE = 64 * 1024 * 1024
+COUNT_CACHE_SUFFIX = ".xzar-count"
+
+
+def count_record_ends(buffer, quotechar: str = '"') -> int:
+    import numpy as np
+
+    data = np.frombuffer(buffer, dtype=np.uint8)
+
+    quote = ord(quotechar)
+    newline = ord("\n")
+
+    count = 0
+    in_quotes = 0
+
+    for i in range(0, data.shape[0], CHUNK_SIZE):
+        chunk = data[i : i + CHUNK_SIZE]
+
+        newlines = np.flatnonzero(chunk == newline)
+        quotes = np.flatnonzero(chunk == quote)
+
+        if quotes.size == 0:
+            if not in_quotes:
+                count += newlines.size
+
+            continue
+
+        quotes_before = np.searchsorted(quotes, newlines) + in_quotes
+        count += int(np.count_nonzero((quotes_before & 1) == 0))
+        in_quotes = (in_quotes + quotes.size) & 1
+
+    if data[-1] != newline:
+        count += 1
+
+    return count
+
+
+def count_csv_records(path: str, quotechar: str = '"') -> int:
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return 0
+
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            # NOTE: minus the header
+            return max(0, count_record_ends(mm, quotechar) - 1)
+
+
+def get_count_cache_path(path: str) -> str:
+    directory, filename = os.path.split(os.path.abspath(path))
+
+    return os.path.join(directory, "." + filename + COUNT_CACHE_SUFFIX)
+
+
+def cached_count_csv_records(path: str, quotechar: str = '"') -> int:
+    stat = os.stat(path)
+    key = {"size": stat.st_size, "mtime": stat.st_mtime_ns, "quotechar": quotechar}
+
+    cache_path = get_count_cache_path(path)
+
+    try:
+        with open(cache_path, "r", encoding="utf-8") as f:
+            cached = json.load(f)
+
+        if cached["key"] == key:
+            return cached["count"]
+    except (OSError, ValueError, KeyError, TypeError):
+        pass
+
+    count = count_csv_records(path, quotechar)
+
+    # NOTE: not being able to write the cache, e.g. because the directory
+    # is read-only, should not prevent us from returning the count
+    try:
+        with open(cache_path, "w", encoding="utf-8") as f:
+            json.dump({"key": key, "count": count}, f)
+    except OSError:
+        pass
+
+    return count
@@ -0,0 +1,24 @@
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from sentence_transformers import SentenceTransformer
+
+DEFAULT_EMBEDDING_MODEL = "ibm-granite/granite-embedding-107m-multilingual"
+
+# NOTE: loaded models are kept around so that library calls, which can
+# happen many times in a same process, don't have to reload them each time
+MODEL_CACHE: dict[str, "SentenceTransformer"] = {}
+
+
+def acquire_sentence_transformer(model: str) -> "SentenceTransformer":
+    transformer = MODEL_CACHE.get(model)
+
+    if transformer is not None:
+        return transformer
+
+    from sentence_transformers import SentenceTransformer
+
+    transformer = SentenceTransformer(model)
+    MODEL_CACHE[model] = transformer
+
+    return transformer
@@ -1,5 +1,10 @@
-from typing import ContextManager
+from typing import ContextManager, IO, Literal
 
+import os
+import sys
+import json
+from time import monotonic
+from threading import Thread, Event
 from contextlib import nullcontext
 from casanova import Enricher, RowCountResumer
 from rich.progress import (
@@ -10,9 +15,51 @@ from rich.progress import (
     SpinnerColumn,
     TimeRemainingColumn,
     MofNCompleteColumn,
+    ProgressColumn,
 )
 
 from .console import console
+from .counting import cached_count_csv_records
+
+ProgressMode = Literal["auto", "bar", "json", "none"]
+
+# NOTE: progress is reported by a background thread at those intervals, in
+# seconds, from counters that the hot loops only need to increment
+BAR_REFRESH_INTERVAL = 0.1
+JSON_REPORT_INTERVAL = 5.0
+
+PROGRESS_MODE: ProgressMode = "auto"
+
+
+def set_progress_mode(mode: ProgressMode) -> None:
+    global PROGRESS_MODE
+
+    PROGRESS_MODE = mode
+
+
+def resolve_progress_mode() -> ProgressMode:
+    if PROGRESS_MODE != "auto":
+        return PROGRESS_MODE
+
+    return "bar" if console.is_terminal else "json"
+
+
+def get_columns(finite: bool) -> list[ProgressColumn]:
+    if finite:
+        return [
+            TextColumn("[progress.description]{task.description}"),
+            SpinnerColumn(),
+            BarColumn(),
+            TaskProgressColumn(),
+            MofNCompleteColumn(),
+            TimeRemainingColumn(),
+        ]
+
+    return [
+        TextColumn("[progress.description]{task.description}"),
+        SpinnerColumn(),
+        MofNCompleteColumn(),
+    ]
 
 
 # ref: https://rich.readthedocs.io/en/stable/progress.html
@@ -24,35 +71,36 @@ class LoadingBar:
         transient: bool = False,
         already_completed: int | None = None,
     ):
-        if total is not None:
-            columns = [
-                TextColumn("[progress.description]{task.description}"),
-                SpinnerColumn(),
-                BarColumn(),
-                TaskProgressColumn(),
-                MofNCompleteColumn(),
-                TimeRemainingColumn(),
-            ]
-        else:
-            columns = [
-                TextColumn("[progress.description]{task.description}"),
-                SpinnerColumn(),
-                MofNCompleteColumn(),
-            ]
-
-        self.progress = Progress(
-            *columns,
-            console=console,
-            transient=transient,
-        )
-        self.task = self.progress.add_task(title, total=total)
-
-        if already_completed is not None:
-            self.advance(already_completed)
+        self.title = title
+        self.total = total
+        self.completed = already_completed or 0
+        self.already_completed = self.completed
+        self.mode = resolve_progress_mode()
+
+        self.progress = None
+
+        if self.mode == "bar":
+            self.progress = Progress(
+                *get_columns(total is not None),
+                console=console,
+                transient=transient,
+                auto_refresh=False,
+            )
+            self.task = self.progress.add_task(
+                title, total=total, completed=self.completed
+            )
+
+        self.started_at = monotonic()
+        self.stopped = Event()
+        self.reporter = None
 
     @classmethod
     def from_enricher(
-        cls, enricher: Enricher, title: str, total: int | None = None
+        cls,
+        enricher: Enricher,
+        title: str,
+        total: int | None = None,
+        count: bool = True,
     ) -> "LoadingBar":
         actual_total = enricher.total
 
@@ -64,7 +112,14 @@ class LoadingBar:
         if enricher.resumer is not None:
             already_completed = enricher.resumer.already_done_count()
 
-        return cls(title, total=actual_total, already_completed=already_completed)
+        loading_bar = cls(
+            title, total=actual_total, already_completed=already_completed
+        )
+
+        if actual_total is None and count:
+            loading_bar.count_in_background(enricher.input_file)
+
+        return loading_bar
 
     @classmethod
     def resuming(cls, output) -> ContextManager:
@@ -84,15 +139,97 @@ class LoadingBar:
 
         return resume_loading_bar
 
+    def set_total(self, total: int):
+        self.total = total
+
+        if self.progress is not None:
+            self.progress.columns = tuple(get_columns(True))
+            self.progress.update(self.task, total=total)
+
+    def count_in_background(self, input_file: IO | None) -> None:
+        # NOTE: the count would never be used
+        if self.mode == "none":
+            return
+
+        path = getattr(input_file, "name", None)
+
+        # NOTE: we can only count regular files, not stdin or pipes
+        if not isinstance(path, str) or not os.path.isfile(path):
+            return
+
+        def count():
+            try:
+                total = cached_count_csv_records(path)
+            except (OSError, ValueError):
+                return
+
+            self.set_total(total)
+
+        Thread(target=count, daemon=True).start()
+
     def advance(self, count: int = 1):
-        self.progress.update(self.task, advance=count)
+        self.completed += count
+
+    def report(self, done: bool = False):
+        if self.progress is not None:
+            self.progress.update(self.task, completed=self.completed)
+            self.progress.refresh()
+            return
+
+        if self.mode != "json":
+            return
+
+        elapsed = monotonic() - self.started_at
+        rate = (self.completed - self.already_completed) / elapsed if elapsed else 0.0
+        eta = None
+
+        if self.total is not None and rate > 0:
+            eta = max(0.0, (self.total - self.completed) / rate)
+
+        line = {
+            "task": self.title,
+            "rows": self.completed,
+            "total": self.total,
+            "rows_per_second": round(rate, 3),
+            "elapsed": round(elapsed, 3),
+            "eta": round(eta, 3) if eta is not None else None,
+            "done": done,
+        }
+
+        print(json.dumps(line), file=sys.stderr, flush=True)
 
     def __enter__(self) -> "LoadingBar":
-        self.progress.__enter__()
+        if self.mode == "none":
+            return self
+
+        if self.progress is not None:
+            self.progress.__enter__()
+            interval = BAR_REFRESH_INTERVAL
+        else:
+            interval = JSON_REPORT_INTERVAL
+
+        self.started_at = monotonic()
+
+        def report_periodically():
+            while not self.stopped.wait(interval):
+                self.report()
+
+        self.reporter = Thread(target=report_periodically, daemon=True)
+        self.reporter.start()
+
         return self
 
     def __exit__(self, *args):
-        self.progress.__exit__(*args)
+        if self.reporter is not None:
+            self.stopped.set()
+            self.reporter.join()
+            self.reporter = None
+
+        if self.mode != "none":
+            self.report(done=True)
+
+        if self.progress is not None:
+            self.progress.__exit__(*args)
 
     def print(self, msg):
         console.print(msg)
@@ -0,0 +1,317 @@
+from typing import Iterable, Iterator, TypeVar, TYPE_CHECKING
+
+from math import ceil
+from array import array
+from collections import deque
+from ebbe import as_chunks
+
+from .spacy_models import (
+    SpacyLang,
+    SpacyModelSize,
+    acquire_model,
+    download_model_if_needed,
+)
+from .utils import as_latency_bounded_chunks
+
+if TYPE_CHECKING:
+    from spacy.language import Language
+
+# Running spaCy NER on multiple processes without `nlp.pipe(n_process=...)`:
+#   - `nlp.pipe` sends whole serialized Docs back to the parent, which is
+#     costly to pickle and to hold in memory, while we only need the
+#     entities.
+#   - here workers instead send back, for each batch, flat arrays of entity
+#     char offsets and label ids. Since the parent already has the texts,
+#     it only needs to slice them, so its overhead scales with the number
+#     of entities found, not with the size of the documents.
+#   - batches are dispatched with a bounded window of pending tasks, to keep
+#     rows in order and memory bounded whatever the size of the input.
+#   - each batch is tagged with a lang, so that rows written in different
+#     languages can be routed to their own pipelines. Those are loaded lazily
+#     by each process, and only a bounded number of them are kept in memory.
+
+T = TypeVar("T")
+
+DEFAULT_BATCH_SIZE = 1000
+PENDING_BATCHES_PER_PROCESS = 2
+MAX_HELD_BATCHES = 4
+
+# Per batch: entity count per doc, entity start offsets, entity end offsets,
+# entity label ids and the table those ids refer to.
+CompactEntities = tuple[array, array, array, array, list[str]]
+Entities = list[tuple[str, str]]
+
+
+def extract_compact_entities(
+    nlp: "Language", texts: list[str], batch_size: int | None = None
+) -> CompactEntities:
+    counts = array("I")
+    starts = array("I")
+    ends = array("I")
+    label_ids = array("H")
+    label_table: dict[str, int] = {}
+
+    for doc in nlp.pipe(texts, batch_size=batch_size):
+        counts.append(len(doc.ents))
+
+        for entity in doc.ents:
+            starts.append(entity.start_char)
+            ends.append(entity.end_char)
+
+            label_id = label_table.get(entity.label_)
+
+            if label_id is None:
+                label_id = len(label_table)
+                label_table[entity.label_] = label_id
+
+            label_ids.append(label_id)
+
+    return counts, starts, ends, label_ids, list(label_table)
+
+
+def decode_compact_entities(
+    texts: list[str], compact: CompactEntities
+) -> Iterator[Entities]:
+    counts, starts, ends, label_ids, label_table = compact
+
+    i = 0
+
+    for text, count in zip(texts, counts):
+        yield [
+            (text[starts[j] : ends[j]], label_table[label_ids[j]])
+            for j in range(i, i + count)
+        ]
+
+        i += count
+
+
+# NOTE: those are only set in worker processes, by `init_worker`
+WORKER_SIZE: SpacyModelSize = "sm"
+WORKER_MAX_MODELS: int | None = None
+
+
+def init_worker(size: SpacyModelSize, max_models: int | None) -> None:
+    import signal
+
+    global WORKER_SIZE, WORKER_MAX_MODELS
+
+    # NOTE: the parent process is the one handling ctrl+c
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    WORKER_SIZE = size
+    WORKER_MAX_MODELS = max_models
+
+
+def worker(
+    lang: SpacyLang, texts: list[str], batch_size: int | None
+) -> CompactEntities:
+    nlp = acquire_model(lang, WORKER_SIZE, ["ner"], max_cached=WORKER_MAX_MODELS)
+
+    return extract_compact_entities(nlp, texts, batch_size)
+
+
+class NerPool:
+    def __init__(
+        self,
+        lang: SpacyLang,
+        size: SpacyModelSize,
+        processes: int = 1,
+        batch_size: int | None = None,
+        max_models: int | None = None,
+    ):
+        self.lang = lang
+        self.size = size
+        self.processes = processes
+        self.batch_size = batch_size
+        self.max_models = max_models
+
+        self.downloaded: set[SpacyLang] = set()
+        self.pool = None
+
+    def acquire_model(self, lang: SpacyLang) -> "Language":
+        return acquire_model(lang, self.size, ["ner"], max_cached=self.max_models)
+
+    def download_model_if_needed(self, lang: SpacyLang) -> None:
+        # NOTE: downloading once beforehand so that workers don't race to do it
+        if lang in self.downloaded:
+            return
+
+        download_model_if_needed(lang, self.size)
+        self.downloaded.add(lang)
+
+    def __enter__(self) -> "NerPool":
+        if self.processes > 1:
+            from multiprocessing import Pool
+
+            self.download_model_if_needed(self.lang)
+
+            self.pool = Pool(
+                self.processes,
+                initializer=init_worker,
+                initargs=(self.size, self.max_models),
+            )
+        else:
+            # NOTE: loading the default model right away so that we fail early
+            self.acquire_model(self.lang)
+
+        return self
+
+    def __exit__(self, *args):
+        if self.pool is not None:
+            self.pool.terminate()
+            self.pool.join()
+            self.pool = None
+
+    def imap_lang_batches(
+        self,
+        batches: Iterable[tuple[SpacyLang, list[tuple[str, T]]]],
+        wait: bool = False,
+    ) -> Iterator[list[tuple[Entities, T]]]:
+        if self.pool is None:
+            for lang, batch in batches:
+                nlp = self.acquire_model(lang)
+
+                yield [
+                    ([(entity.text, entity.label_) for entity in doc.ents], context)
+                    for doc, context in nlp.pipe(
+                        batch, as_tuples=True, batch_size=self.batch_size
+                    )
+                ]
+
+            return
+
+        pending = deque()
+
+        def flush_oldest() -> list[tuple[Entities, T]]:
+            texts, contexts, result = pending.popleft()
+
+            return list(zip(decode_compact_entities(texts, result.get()), contexts))
+
+        for lang, batch in batches:
+            self.download_model_if_needed(lang)
+
+            # NOTE: when waiting for each batch right away, it is split among
+            # workers to still use all of them
+            if wait:
+                sub_batches = as_chunks(ceil(len(batch) / self.processes), batch)
+            else:
+                sub_batches = [batch]
+
+            for sub_batch in sub_batches:
+                texts = [text for text, _ in sub_batch]
+                contexts = [c for _, c in sub_batch]
+
+                pending.append(
+                    (
+                        texts,
+                        contexts,
+                        self.pool.apply_async(worker, (lang, texts, self.batch_size)),
+                    )
+                )
+
+            if wait:
+                yield [item for _ in range(len(pending)) for item in flush_oldest()]
+
+            elif len(pending) >= self.processes * PENDING_BATCHES_PER_PROCESS:
+                yield flush_oldest()
+
+        while pending:
+            yield flush_oldest()
+
+    def imap_batches(
+        self, items: Iterable[tuple[str, T]], max_latency: float | None = None
+    ) -> Iterator[list[tuple[Entities, T]]]:
+        batch_size = self.batch_size or DEFAULT_BATCH_SIZE
+
+        return self.imap_lang_batches(
+            (
+                (self.lang, batch)
+                for batch in as_latency_bounded_chunks(batch_size, items, max_latency)
+            ),
+            wait=max_latency is not None,
+        )
+
+    def imap_routed_batches(
+        self,
+        items: Iterable[tuple[str, SpacyLang | None, T]],
+        max_latency: float | None = None,
+    ) -> Iterator[list[tuple[Entities, T]]]:
+        batch_size = self.batch_size or DEFAULT_BATCH_SIZE
+        max_held = batch_size * MAX_HELD_BATCHES
+
+        # NOTE: index of the next row to emit, rows before it being done
+        next_index = 0
+
+        # Rows are routed into one queue per lang, and a queue is processed
+        # when full. Rows read but not emitted yet are held in those queues,
+        # by the workers or in the reorder buffer, waiting for a row of a rarer
+        # lang. So when there are too many of them, the queue holding the next
+        # row to emit is processed even if not full, which bounds memory and
+        # lets rows be emitted while the input is streamed
+        def routed_batches():
+            queues: dict[SpacyLang, list[tuple[str, tuple[int, T]]]] = {}
+
+            for index, (text, lang, context) in enumerate(items):
+                if lang is None:
+                    lang = self.lang
+
+                queue = queues.setdefault(lang, [])
+                queue.append((text, (index, context)))
+
+                if len(queue) >= batch_size:
+                    yield lang, queues.pop(lang)
+
+                if index + 1 - next_index <= max_held:
+                    continue
+
+                lang_to_flush = next(
+                    (q for q in queues if queues[q][0][1][0] == next_index), None
+                )
+
+                if lang_to_flush is not None:
+                    yield lang_to_flush, queues.pop(lang_to_flush)
+
+            for lang, batch in sorted(queues.items(), key=lambda q: q[1][0][1][0]):
+                yield lang, batch
+
+        # With a deadline, each latency-bounded chunk is instead split by lang
+        # and processed right away, so that no row waits for its queue to fill
+        def deadline_batches():
+            index = 0
+
+            for chunk in as_latency_bounded_chunks(batch_size, items, max_latency):
+                queues: dict[SpacyLang, list[tuple[str, tuple[int, T]]]] = {}
+
+                for text, lang, context in chunk:
+                    if lang is None:
+                        lang = self.lang
+
+                    queues.setdefault(lang, []).append((text, (index, context)))
+                    index += 1
+
+                yield from queues.items()
+
+        if max_latency is None:
+            lang_batches = self.imap_lang_batches(routed_batches())
+        else:
+            lang_batches = self.imap_lang_batches(deadline_batches(), wait=True)
+
+        buffer: dict[int, tuple[Entities, T]] = {}
+
+        for batch in lang_batches:
+            for entities, (index, context) in batch:
+                buffer[index] = (entities, context)
+
+            ready = []
+
+            while next_index in buffer:
+                ready.append(buffer.pop(next_index))
+                next_index += 1
+
+            yield ready
+
+    def imap(
+        self, items: Iterable[tuple[str, T]], max_latency: float | None = None
+    ) -> Iterator[tuple[Entities, T]]:
+        for batch in self.imap_batches(items, max_latency):
+            yield from batch
@@ -0,0 +1,142 @@
+import os
+import sys
+import json
+import math
+from dataclasses import dataclass, asdict
+
+from .console import console
+from .loading_bar import resolve_progress_mode
+
+# Planning how many processes and intra-op threads to use:
+#   1. we find how many CPUs we are actually allowed to use, which can be
+#      less than the machine's count because of the CPU affinity mask or
+#      cgroup quotas (docker, kubernetes etc.).
+#   2. we split those CPUs between processes and threads per process, so
+#      that processes * threads never exceeds them.
+#   3. we apply the thread count through environment variables, that will
+#      be read by torch/BLAS/thinc when imported, including in worker
+#      processes since they inherit the environment, and to the libraries
+#      that are already loaded.
+
+CGROUP_ROOT = "/sys/fs/cgroup"
+
+THREAD_ENV_VARIABLES = [
+    "OMP_NUM_THREADS",
+    "OPENBLAS_NUM_THREADS",
+    "MKL_NUM_THREADS",
+    "BLIS_NUM_THREADS",
+    "VECLIB_MAXIMUM_THREADS",
+    "NUMEXPR_NUM_THREADS",
+]
+
+# NOTE: variables already set when xzar is imported were set by the user and
+# are never overridden, while the ones we set ourselves are updated by each
+# new plan, since a same process can run several commands or library calls
+USER_THREAD_ENV_VARIABLES = frozenset(
+    name for name in THREAD_ENV_VARIABLES if name in os.environ
+)
+
+
+def read_cgroup_cpu_quota(root: str = CGROUP_ROOT) -> float | None:
+    # cgroup v2
+    try:
+        with open(os.path.join(root, "cpu.max")) as f:
+            quota, period = f.read().split()
+
+        if quota == "max":
+            return None
+
+        return int(quota) / int(period)
+    except (OSError, ValueError):
+        pass
+
+    # cgroup v1
+    try:
+        with open(os.path.join(root, "cpu", "cpu.cfs_quota_us")) as f:
+            quota = int(f.read())
+
+        with open(os.path.join(root, "cpu", "cpu.cfs_period_us")) as f:
+            period = int(f.read())
+
+        if quota <= 0 or period <= 0:
+            return None
+
+        return quota / period
+    except (OSError, ValueError):
+        pass
+
+    return None
+
+
+def count_affinity_cpus() -> int:
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+
+    return os.cpu_count() or 1
+
+
+@dataclass
+class ResourcePlan:
+    cpus: int
+    processes: int
+    threads: int
+    constraint: str
+
+    def __str__(self) -> str:
+        return "using {} process{} with {} thread{} each ({} CPU{} available, limited by {})".format(
+            self.processes,
+            "es" if self.processes > 1 else "",
+            self.threads,
+            "s" if self.threads > 1 else "",
+            self.cpus,
+            "s" if self.cpus > 1 else "",
+            self.constraint,
+        )
+
+
+def plan_resources(processes: int = 1, root: str = CGROUP_ROOT) -> ResourcePlan:
+    cpus = count_affinity_cpus()
+    constraint = "affinity mask"
+
+    quota = read_cgroup_cpu_quota(root)
+
+    if quota is not None and math.ceil(quota) < cpus:
+        cpus = max(1, math.ceil(quota))
+        constraint = "cgroup quota"
+
+    if processes == -1:
+        processes = cpus
+
+    return ResourcePlan(
+        cpus=cpus,
+        processes=processes,
+        threads=max(1, cpus // processes),
+        constraint=constraint,
+    )
+
+
+def apply_resource_plan(plan: ResourcePlan) -> None:
+    threads = str(plan.threads)
+
+    for name in THREAD_ENV_VARIABLES:
+        if name not in USER_THREAD_ENV_VARIABLES:
+            os.environ[name] = threads
+
+    if "torch" in sys.modules:
+        sys.modules["torch"].set_num_threads(plan.threads)
+
+    try:
+        from threadpoolctl import threadpool_limits
+    except ImportError:
+        pass
+    else:
+        threadpool_limits(plan.threads)
+
+
+def log_resource_plan(plan: ResourcePlan) -> None:
+    # NOTE: when progress is reported as JSON lines, stderr must only
+    # contain JSON lines so that it can be parsed by orchestrators
+    if resolve_progress_mode() == "json":
+        print(json.dumps({"resources": asdict(plan)}), file=sys.stderr, flush=True)
+    else:
+        console.print("[dim]" + str(plan))
@@ -1,4 +1,4 @@
-from typing import Literal, TYPE_CHECKING
+from typing import Literal, TYPE_CHECKING, get_args
 
 if TYPE_CHECKING:
     from spacy.language import Language
@@ -10,6 +10,8 @@ SpacyLang = Literal[
     "fr",
 ]
 
+SPACY_LANGS: set[SpacyLang] = set(get_args(SpacyLang))
+
 MODEL_TYPE_PER_LANG: dict[SpacyLang, str] = {
     "de": "news",
     "en": "web",
@@ -18,6 +20,16 @@ MODEL_TYPE_PER_LANG: dict[SpacyLang, str] = {
 MODEL_TRF_DEP_LANG = {"de", "fr"}
 
 
+def parse_spacy_lang(value: str) -> SpacyLang | None:
+    # NOTE: we accept regional variants such as "en-US" or "fr_FR"
+    lang = value.strip().lower().replace("_", "-").split("-", 1)[0]
+
+    if lang not in SPACY_LANGS:
+        return None
+
+    return lang  # type: ignore
+
+
 def get_spacy_model_handle(lang: SpacyLang, size: SpacyModelSize) -> str:
     model_type = MODEL_TYPE_PER_LANG[lang]
     model_core = "dep" if size == "trf" and lang in MODEL_TRF_DEP_LANG else "core"
@@ -48,8 +60,32 @@ def get_spacy_exclude(include: list[str]) -> list[str]:
     return [c for c in SPICY_PIPELINE_COMPONENTS if c not in include]
 
 
+def download_model_if_needed(lang: SpacyLang, size: SpacyModelSize) -> None:
+    import sys
+    import spacy
+    from contextlib import redirect_stdout
+
+    spacy_model_handle = get_spacy_model_handle(lang, size)
+
+    if spacy.util.is_package(spacy_model_handle):
+        return
+
+    with redirect_stdout(sys.stderr):
+        spacy.cli.download(spacy_model_handle, False, False, "--quiet")  # type: ignore
+
+
+# NOTE: loaded models are kept around so that library calls, which can
+# happen many times in a same process, don't have to reload them each time.
+# The dict is kept in least recently used order, so that we can unload the
+# oldest models when asked to keep only some of them.
+MODEL_CACHE: dict[tuple[str, tuple[str, ...]], "Language"] = {}
+
+
 def acquire_model(
-    lang: SpacyLang, size: SpacyModelSize, include: list[str]
+    lang: SpacyLang,
+    size: SpacyModelSize,
+    include: list[str],
+    max_cached: int | None = None,
 ) -> "Language":
     import sys
     import spacy
@@ -58,6 +94,17 @@ def acquire_model(
     spacy_model_handle = get_spacy_model_handle(lang, size)
     spacy_exclude = get_spacy_exclude(include)
 
+    cache_key = (spacy_model_handle, tuple(spacy_exclude))
+    nlp = MODEL_CACHE.pop(cache_key, None)
+
+    if nlp is not None:
+        MODEL_CACHE[cache_key] = nlp
+        return nlp
+
+    if max_cached is not None:
+        while MODEL_CACHE and len(MODEL_CACHE) >= max_cached:
+            del MODEL_CACHE[next(iter(MODEL_CACHE))]
+
     try:
         nlp = spacy.load(spacy_model_handle, exclude=spacy_exclude)
     except OSError:
@@ -65,4 +112,6 @@ def acquire_model(
             spacy.cli.download(spacy_model_handle, False, False, "--quiet")  # type: ignore
         nlp = spacy.load(spacy_model_handle, exclude=spacy_exclude)
 
+    MODEL_CACHE[cache_key] = nlp
+
     return nlp
@@ -1,5 +1,11 @@
+from typing import Iterable, Iterator, TypeVar
+
 import sys
 import platform
+from time import monotonic
+from queue import Queue, Empty
+from threading import Thread
+from ebbe import as_chunks
 
 
 def acquire_cross_platform_stdout():
@@ -28,3 +34,66 @@ def acquire_cross_platform_stdout():
         )
 
     return sys.stdout
+
+
+T = TypeVar("T")
+
+END_OF_STREAM = object()
+
+
+def as_latency_bounded_chunks(
+    size: int, iterable: Iterable[T], max_latency: float | None = None
+) -> Iterator[list[T]]:
+    # Without a deadline, this is the same as regular chunking, with no
+    # additional overhead for bulk files
+    if max_latency is None:
+        yield from as_chunks(size, iterable)
+        return
+
+    # Else items are read in a separate thread, so that we can stop waiting
+    # for the next one when the deadline of the current chunk expires. The
+    # deadline starts when the first item of a chunk is received.
+    queue: Queue = Queue(maxsize=size)
+    error: list[BaseException] = []
+
+    def produce():
+        try:
+            for item in iterable:
+                queue.put(item)
+        except BaseException as e:
+            error.append(e)
+        finally:
+            queue.put(END_OF_STREAM)
+
+    Thread(target=produce, daemon=True).start()
+
+    chunk: list[T] = []
+    deadline = 0.0
+
+    while True:
+        try:
+            item = queue.get(
+                timeout=max(0.0, deadline - monotonic()) if chunk else None
+            )
+        except Empty:
+            yield chunk
+            chunk = []
+            continue
+
+        if item is END_OF_STREAM:
+            break
+
+        if not chunk:
+            deadline = monotonic() + max_latency
+
+        chunk.append(item)
+
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+
+    if chunk:
+        yield chunk
+
+    if error:
+        raise error[0]